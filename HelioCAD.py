@@ -1,30 +1,229 @@
 import sys
 import os
 import json
+import math
+from itertools import starmap
+import importlib
 import importlib.util
+import numpy as np
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QPushButton, QVBoxLayout, QHBoxLayout,
     QFileDialog, QDialog, QLabel, QComboBox, QDialogButtonBox, QCheckBox,
-    QTabWidget
+    QTabWidget, QMessageBox
 )
-from PyQt6.QtGui import QPainter, QPen, QColor, QIcon
-from PyQt6.QtCore import Qt, QPointF, QRectF, QSettings
+from PyQt6.QtGui import QPainter, QPainterPath, QPen, QColor, QIcon, QPixmap, QPolygonF
+from PyQt6.QtCore import Qt, QPointF, QLineF, QRectF, QSettings, QTimer
 
-import svgwrite
+try:
+    import orjson  # optional, much faster .hcad save/load
+except ImportError:
+    orjson = None
+
+try:
+    from numba import njit  # optional, compiles the shape hit-test
+except ImportError:
+    njit = None
 
 GRID_SIZE = 20
+PEN_WIDTH = 2
+PREVIEW_INTERVAL_MS = 16  # ~60 preview repaints per second while dragging
 PLUGIN_FOLDER = "modules"
+HCAD_VERSION = 2
+
+DARK_QSS = """
+    QWidget {
+        background-color: #222;
+        color: #ddd;
+    }
+    QPushButton {
+        background-color: #444;
+        color: #ddd;
+        border: none;
+        padding: 5px;
+    }
+    QPushButton:hover {
+        background-color: #666;
+    }
+"""
+
+LIGHT_QSS = """
+    QWidget {
+        background-color: white;
+        color: black;
+    }
+    QPushButton {
+        background-color: #eee;
+        color: black;
+        border: 1px solid #ccc;
+        padding: 5px;
+    }
+    QPushButton:hover {
+        background-color: #ddd;
+    }
+"""
+
+# Shapes are stored by numeric tool id; the ids are also what .hcad files hold.
+TOOL_IDS = {"line": 0, "rectangle": 1, "circle": 2}
+TOOL_NAMES = {i: name for name, i in TOOL_IDS.items()}
+LINE, RECTANGLE, CIRCLE = TOOL_IDS["line"], TOOL_IDS["rectangle"], TOOL_IDS["circle"]
+
+SVG_HEADER = (
+    '<?xml version="1.0" encoding="utf-8" ?>\n'
+    '<svg baseProfile="tiny" height="100%" version="1.2" width="100%" '
+    'xmlns="http://www.w3.org/2000/svg">\n'
+)
+SVG_FOOTER = '</svg>\n'
+
+
+def shape_rows(tool_ids, points):
+    """Extend (x1, y1, x2, y2) rows with the radius column used for circles."""
+    rows = np.zeros((len(points), 5), dtype=np.float32)
+    rows[:, :4] = points
+    circle = tool_ids == CIRCLE
+    rows[circle, 4] = np.hypot(rows[circle, 2] - rows[circle, 0], rows[circle, 3] - rows[circle, 1])
+    return rows
+
+
+def shape_bounds(tool_ids, coords):
+    """Return the geometric (left, top, right, bottom) bounds of an array of shapes."""
+    x1, y1, x2, y2, radius = coords[:, 0], coords[:, 1], coords[:, 2], coords[:, 3], coords[:, 4]
+    circle = tool_ids == CIRCLE
+    bounds = np.empty((len(coords), 4), dtype=np.float32)
+    bounds[:, 0] = np.where(circle, x1 - radius, np.minimum(x1, x2))
+    bounds[:, 1] = np.where(circle, y1 - radius, np.minimum(y1, y2))
+    bounds[:, 2] = np.where(circle, x1 + radius, np.maximum(x1, x2))
+    bounds[:, 3] = np.where(circle, y1 + radius, np.maximum(y1, y2))
+    return bounds
+
+
+def shape_bboxes(tool_ids, coords):
+    """Return pen-padded (left, top, right, bottom) boxes for an array of shapes."""
+    boxes = shape_bounds(tool_ids, coords)
+    # Padded by the pen width so strokes on the edge (and zero-height
+    # horizontal/vertical lines) still intersect the dirty region.
+    boxes[:, :2] -= PEN_WIDTH
+    boxes[:, 2:] += PEN_WIDTH
+    return boxes
+
+
+def _svg_attrs(*pairs):
+    # ' name="value"' for each (name, column) pair, concatenated per row.
+    # %.9g round-trips float32 exactly and avoids exponents below 1e9.
+    out = ""
+    for name, column in pairs:
+        out = np.char.add(np.char.add(out, f' {name}="'), np.char.add(np.char.mod("%.9g", column), '"'))
+    return out
+
+
+def svg_tags(tool_ids, coords, stroke):
+    """Format one SVG element per shape, a whole tool's worth at a time."""
+    tags = np.empty(len(tool_ids), dtype=object)
+    bounds = shape_bounds(tool_ids, coords)
+    is_line = tool_ids == LINE
+    is_rect = tool_ids == RECTANGLE
+    is_circle = tool_ids == CIRCLE
+    line, circle = coords[is_line], coords[is_circle]
+    rect = bounds[is_rect].astype(np.float64)
+    tags[is_line] = np.char.add(np.char.add("<line", _svg_attrs(
+        ("x1", line[:, 0]), ("y1", line[:, 1]), ("x2", line[:, 2]), ("y2", line[:, 3]))),
+        f" {stroke} />")
+    tags[is_rect] = np.char.add(np.char.add("<rect", _svg_attrs(
+        ("x", rect[:, 0]), ("y", rect[:, 1]),
+        ("width", rect[:, 2] - rect[:, 0]), ("height", rect[:, 3] - rect[:, 1]))),
+        f' {stroke} fill="none" />')
+    tags[is_circle] = np.char.add(np.char.add("<circle", _svg_attrs(
+        ("cx", circle[:, 0]), ("cy", circle[:, 1]), ("r", circle[:, 4]))),
+        f' {stroke} fill="none" />')
+    return tags.tolist()
+
+
+def _shapes_in_rect_numpy(boxes, left, top, right, bottom):
+    return ((boxes[:, 0] <= right) & (boxes[:, 2] >= left)
+            & (boxes[:, 1] <= bottom) & (boxes[:, 3] >= top))
+
+
+def _shapes_in_rect_loop(boxes, left, top, right, bottom):
+    mask = np.empty(boxes.shape[0], dtype=np.bool_)
+    for i in range(boxes.shape[0]):
+        mask[i] = (boxes[i, 0] <= right and boxes[i, 2] >= left
+                   and boxes[i, 1] <= bottom and boxes[i, 3] >= top)
+    return mask
+
+
+# shapes_in_rect(boxes, left, top, right, bottom) returns a mask of the shapes
+# whose bounding box intersects the rectangle. With numba it is a single
+# compiled pass; compile it now so the first repaint doesn't pay for it.
+if njit is not None:
+    shapes_in_rect = njit(cache=True)(_shapes_in_rect_loop)
+    shapes_in_rect(np.zeros((1, 4), dtype=np.float32), 0.0, 0.0, 0.0, 0.0)
+else:
+    shapes_in_rect = _shapes_in_rect_numpy
+
 
 class Canvas(QWidget):
     def __init__(self):
         super().__init__()
         self.setMouseTracking(True)
-        self.shapes = []
+        # Shapes live in growable parallel arrays: one tool id and one
+        # (x1, y1, x2, y2, radius) row per shape, plus its bounding box.
+        # The radius is only set for circles and is never saved.
+        self._count = 0
+        self._tool_id = np.zeros(64, dtype=np.uint8)
+        self._coords = np.zeros((64, 5), dtype=np.float32)
+        self._bboxes = np.zeros((64, 4), dtype=np.float32)
+        # Paint-ready primitive per shape (QLineF for lines, QRectF for
+        # rectangles and circle bounds), plus per-tool lists so a full
+        # repaint can hand each tool's shapes to Qt in a single call.
+        self._primitives = np.empty(64, dtype=object)
+        self._lines = []
+        self._rects = []
+        self._circles = QPainterPath()
+        # Runs of connected line segments are drawn as polylines instead of
+        # being left in self._lines; _open_polyline is the run the last shape
+        # belongs to, if any.
+        self._polylines = []
+        self._open_polyline = None
+        # [first, end) shape indices of each polyline, and which shapes belong
+        # to one, so clipped repaints can redraw whole runs too.
+        self._polyline_spans = []
+        self._in_run = np.zeros(64, dtype=bool)
+        self._preview_rect = None
+        self._pending_update = False
         self.current_tool = "line"
         self.drawing = False
         self.start_point = None
         self.end_point = None
         self.color_mode = "light"  # default
+        # Pens are created once per mode rather than on every paint.
+        self._pen_light = QPen(QColor(0, 0, 0), PEN_WIDTH)
+        self._pen_dark = QPen(QColor(255, 255, 255), PEN_WIDTH)
+        self._grid_pen_light = QPen(QColor(220, 220, 220), 1)
+        self._grid_pen_dark = QPen(QColor(60, 60, 60), 1)
+        self._grid_pixmap = None
+        self._grid_key = None
+        self._last_snap = None
+        self._shapes_cache = None
+
+    @property
+    def shapes(self):
+        """Snapshot of every shape as (tool, start, end), for plugins.
+
+        This is a read-only tuple, not the storage itself: add shapes with
+        add_shape(), or assign a whole new sequence to replace them all. It is
+        built once and reused until the shapes change.
+        """
+        if self._shapes_cache is None:
+            self._shapes_cache = tuple(
+                (TOOL_NAMES[t], QPointF(x1, y1), QPointF(x2, y2))
+                for t, (x1, y1, x2, y2) in zip(self._tool_id[:self._count].tolist(),
+                                               self._coords[:self._count, :4].tolist()))
+        return self._shapes_cache
+
+    @shapes.setter
+    def shapes(self, shapes):
+        shapes = list(shapes)
+        self.set_shapes([TOOL_IDS[tool] for tool, _, _ in shapes],
+                        [(start.x(), start.y(), end.x(), end.y()) for _, start, end in shapes])
 
     def set_color_mode(self, mode):
         self.color_mode = mode
@@ -37,41 +236,272 @@ class Canvas(QWidget):
 
     def mouseMoveEvent(self, event):
         if self.drawing:
-            self.end_point = self.snap(event.position())
-            self.update()
+            point = self.snap(event.position())
+            # Most mouse moves stay within the same grid cell; nothing to redraw.
+            if point is self.end_point:
+                return
+            self.end_point = point
+            # Coalesce bursts of mouse events into one repaint per frame.
+            if not self._pending_update:
+                self._pending_update = True
+                QTimer.singleShot(PREVIEW_INTERVAL_MS, self._flush_update)
+
+    def _flush_update(self):
+        self._pending_update = False
+        self.update_preview()
 
     def mouseReleaseEvent(self, event):
         if self.drawing:
             self.end_point = self.snap(event.position())
-            self.shapes.append((self.current_tool, self.start_point, self.end_point))
+            self.add_shape(self.current_tool, self.start_point, self.end_point)
+            # The last flushed preview may be stale (or missing) because of the
+            # throttle, so repaint it together with the committed shape.
+            dirty = self.shape_bbox(self.current_tool, self.start_point, self.end_point)
+            if self._preview_rect is not None:
+                dirty = dirty.united(self._preview_rect)
             self.drawing = False
             self.start_point = self.end_point = None
-            self.update()
+            self._preview_rect = None
+            self.update(dirty.toAlignedRect())
+
+    def update_preview(self):
+        # Repaint only the area covered by the old and new preview shape.
+        dirty = self._preview_rect
+        if self.drawing and self.start_point and self.end_point:
+            self._preview_rect = self.shape_bbox(self.current_tool, self.start_point, self.end_point)
+            dirty = self._preview_rect if dirty is None else dirty.united(self._preview_rect)
+        else:
+            self._preview_rect = None
+        if dirty is not None:
+            self.update(dirty.toAlignedRect())
 
     def paintEvent(self, event):
         painter = QPainter(self)
         self.draw_grid(painter)
-        pen_color = QColor(0, 0, 0) if self.color_mode == "light" else QColor(255, 255, 255)
-        pen = QPen(pen_color, 2)
-        painter.setPen(pen)
-
-        for shape in self.shapes:
-            self.draw_shape(painter, *shape)
-
+        painter.setPen(self._pen_light if self.color_mode == "light" else self._pen_dark)
+
+        dirty = QRectF(event.rect())
+        if dirty.contains(QRectF(self.rect())):
+            # Full repaint: one call per tool from the prebuilt batches.
+            lines, rects, circles = self._lines, self._rects, []
+            for polyline in self._polylines:
+                painter.drawPolyline(polyline)
+            if not self._circles.isEmpty():
+                painter.drawPath(self._circles)
+        else:
+            visible = self.visible_mask(dirty)
+            tools = self._tool_id[:self._count]
+            primitives = self._primitives[:self._count]
+            lines = primitives[visible & (tools == LINE) & ~self._in_run[:self._count]].tolist()
+            rects = primitives[visible & (tools == RECTANGLE)].tolist()
+            circles = primitives[visible & (tools == CIRCLE)].tolist()
+            if self._polyline_spans:
+                # A run is redrawn (as a polyline, so its joins match a full
+                # repaint) when any of its segments is visible.
+                spans = np.array(self._polyline_spans)
+                hits = np.concatenate(([0], np.cumsum(visible)))
+                for i in np.flatnonzero(hits[spans[:, 1]] > hits[spans[:, 0]]).tolist():
+                    painter.drawPolyline(self._polylines[i])
+
+        # The shape being dragged rides along in its tool's batch for this
+        # paint only, rather than being drawn by a separate call.
+        batch = None
         if self.drawing and self.start_point and self.end_point:
-            self.draw_shape(painter, self.current_tool, self.start_point, self.end_point)
+            tool_id, primitive = self.preview_primitive()
+            batch = (lines, rects, circles)[tool_id]
+            batch.append(primitive)
+        try:
+            if lines:
+                painter.drawLines(lines)
+            if rects:
+                painter.drawRects(rects)
+            for bounds in circles:
+                painter.drawEllipse(bounds)
+        finally:
+            if batch is not None:
+                batch.pop()
+
+    def preview_primitive(self):
+        tool_id = TOOL_IDS[self.current_tool]
+        start, end = self.start_point, self.end_point
+        if tool_id == LINE:
+            return tool_id, QLineF(start, end)
+        if tool_id == RECTANGLE:
+            return tool_id, QRectF(*self.rect_from_points(start, end))
+        radius = math.hypot(end.x() - start.x(), end.y() - start.y())
+        return tool_id, QRectF(start.x() - radius, start.y() - radius, 2 * radius, 2 * radius)
+
+    def visible_mask(self, rect):
+        return shapes_in_rect(self._bboxes[:self._count],
+                              rect.left(), rect.top(), rect.right(), rect.bottom())
+
+    def resizeEvent(self, event):
+        self._grid_key = None
+        super().resizeEvent(event)
 
     def draw_grid(self, painter):
-        if self.color_mode == "light":
-            grid_color = QColor(220, 220, 220)
-        else:
-            grid_color = QColor(60, 60, 60)
-        pen = QPen(grid_color, 1)
-        painter.setPen(pen)
+        # The grid only changes with size or color mode, so render it once
+        # into a pixmap and blit that on every paint.
+        key = (self.width(), self.height(), self.devicePixelRatioF(), self.color_mode)
+        if key != self._grid_key:
+            self._grid_pixmap = self.build_grid_pixmap()
+            self._grid_key = key
+        painter.drawPixmap(0, 0, self._grid_pixmap)
+
+    def build_grid_pixmap(self):
+        # Allocated in device pixels so HiDPI screens blit it 1:1 instead of
+        # scaling up a logical-size pixmap.
+        dpr = self.devicePixelRatioF()
+        pixmap = QPixmap(max(round(self.width() * dpr), 1), max(round(self.height() * dpr), 1))
+        pixmap.setDevicePixelRatio(dpr)
+        pixmap.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(pixmap)
+        painter.setPen(self._grid_pen_light if self.color_mode == "light" else self._grid_pen_dark)
         for x in range(0, self.width(), GRID_SIZE):
             painter.drawLine(x, 0, x, self.height())
         for y in range(0, self.height(), GRID_SIZE):
             painter.drawLine(0, y, self.width(), y)
+        painter.end()
+        return pixmap
+
+    def add_shape(self, tool, start, end):
+        n = self._count
+        if n == len(self._tool_id):
+            self._reserve(2 * n)
+        tool_id = TOOL_IDS[tool]
+        self._tool_id[n] = tool_id
+        dx, dy = end.x() - start.x(), end.y() - start.y()
+        radius = math.hypot(dx, dy) if tool_id == CIRCLE else 0.0
+        self._coords[n] = (start.x(), start.y(), end.x(), end.y(), radius)
+        self._bboxes[n:n + 1] = shape_bboxes(self._tool_id[n:n + 1], self._coords[n:n + 1])
+        self._count = n + 1
+        x1, y1, x2, y2 = self._coords[n, :4].tolist()
+        self._in_run[n] = False
+        if tool_id == LINE:
+            primitive = QLineF(x1, y1, x2, y2)
+            if n and self._tool_id[n - 1] == LINE and self._coords[n - 1, 2:4].tolist() == [x1, y1]:
+                if self._open_polyline is None:
+                    # The previous line was the last one batched in self._lines
+                    previous = self._lines.pop()
+                    self._open_polyline = QPolygonF([previous.p1(), previous.p2()])
+                    self._polylines.append(self._open_polyline)
+                    self._polyline_spans.append([n - 1, n])
+                    self._in_run[n - 1] = True
+                self._open_polyline.append(QPointF(x2, y2))
+                self._polyline_spans[-1][1] = n + 1
+                self._in_run[n] = True
+            else:
+                self._lines.append(primitive)
+                self._open_polyline = None
+        else:
+            self._open_polyline = None
+            left, top, right, bottom = shape_bounds(self._tool_id[n:n + 1], self._coords[n:n + 1])[0].tolist()
+            primitive = QRectF(left, top, right - left, bottom - top)
+            if tool_id == RECTANGLE:
+                self._rects.append(primitive)
+            else:
+                self._circles.addEllipse(primitive)
+        self._primitives[n] = primitive
+        self._shapes_cache = None
+        left, top, right, bottom = self._bboxes[n].tolist()
+        self.update(QRectF(left, top, right - left, bottom - top).toAlignedRect())
+
+    def set_shapes(self, tool_ids, coords):
+        """Replace every shape with the given tool ids and (x1, y1, x2, y2) rows."""
+        tool_ids = np.asarray(tool_ids, dtype=np.uint8)
+        coords = shape_rows(tool_ids, np.asarray(coords, dtype=np.float32).reshape(-1, 4))
+        n = len(tool_ids)
+        self.clear_shapes()
+        self._reserve(n)
+        self._tool_id[:n] = tool_ids
+        self._coords[:n] = coords
+        self._bboxes[:n] = shape_bboxes(tool_ids, coords)
+        self._count = n
+
+        # Build the paint primitives a whole tool at a time from array
+        # columns rather than branching on every shape.
+        bounds = shape_bounds(tool_ids, coords)
+        bounds[:, 2:] -= bounds[:, :2]  # (left, top, width, height)
+        is_line = tool_ids == LINE
+        is_rect = tool_ids == RECTANGLE
+        is_circle = tool_ids == CIRCLE
+        lines = list(starmap(QLineF, coords[is_line, :4].tolist()))
+        self._lines, self._polylines, self._polyline_spans = self._split_polylines(tool_ids, coords, lines)
+        for first, end in self._polyline_spans:
+            self._in_run[first:end] = True
+        if self._polyline_spans and self._polyline_spans[-1][1] == n:
+            # The last shape ends a connected run, so the next line may extend it
+            self._open_polyline = self._polylines[-1]
+        self._rects = list(starmap(QRectF, bounds[is_rect].tolist()))
+        circles = list(starmap(QRectF, bounds[is_circle].tolist()))
+        for rect in circles:
+            self._circles.addEllipse(rect)
+        primitives = self._primitives
+        primitives[:n][is_line] = lines
+        primitives[:n][is_rect] = self._rects
+        primitives[:n][is_circle] = circles
+        self.update()
+
+    def clear_shapes(self):
+        self._primitives[:self._count] = None
+        self._count = 0
+        self._shapes_cache = None
+        self.update()
+        self._lines = []
+        self._rects = []
+        self._circles = QPainterPath()
+        self._polylines = []
+        self._open_polyline = None
+        self._polyline_spans = []
+        self._in_run[:] = False
+
+    def _split_polylines(self, tool_ids, coords, lines):
+        """Split lines into lone segments and polylines of connected runs.
+
+        Also returns the [first, end) shape indices each polyline covers.
+        """
+        is_line = tool_ids == LINE
+        # A line continues a run when the shape before it is a line that ends
+        # where this one starts.
+        joined = np.zeros(len(tool_ids), dtype=bool)
+        joined[1:] = (is_line[1:] & is_line[:-1]
+                      & (coords[1:, 0] == coords[:-1, 2]) & (coords[1:, 1] == coords[:-1, 3]))
+        run_starts = np.flatnonzero(~joined[is_line])
+        run_ends = np.append(run_starts[1:], len(lines))
+        line_index = np.flatnonzero(is_line).tolist()
+        singles, polylines, spans = [], [], []
+        for start, end in zip(run_starts.tolist(), run_ends.tolist()):
+            if end - start == 1:
+                singles.append(lines[start])
+            else:
+                points = [lines[start].p1()] + [line.p2() for line in lines[start:end]]
+                polylines.append(QPolygonF(points))
+                # Joined lines are consecutive shapes
+                spans.append([line_index[start], line_index[end - 1] + 1])
+        return singles, polylines, spans
+
+    def _reserve(self, capacity):
+        if capacity <= len(self._tool_id):
+            return
+        n = self._count
+        tool_id = np.zeros(capacity, dtype=np.uint8)
+        coords = np.zeros((capacity, 5), dtype=np.float32)
+        bboxes = np.zeros((capacity, 4), dtype=np.float32)
+        primitives = np.empty(capacity, dtype=object)
+        in_run = np.zeros(capacity, dtype=bool)
+        tool_id[:n] = self._tool_id[:n]
+        coords[:n] = self._coords[:n]
+        bboxes[:n] = self._bboxes[:n]
+        primitives[:n] = self._primitives[:n]
+        in_run[:n] = self._in_run[:n]
+        self._tool_id, self._coords, self._bboxes = tool_id, coords, bboxes
+        self._primitives, self._in_run = primitives, in_run
+
+    def shape_bbox(self, tool, start, end):
+        tool_ids = np.array([TOOL_IDS[tool]], dtype=np.uint8)
+        coords = shape_rows(tool_ids, [(start.x(), start.y(), end.x(), end.y())])
+        left, top, right, bottom = shape_bboxes(tool_ids, coords)[0].tolist()
+        return QRectF(left, top, right - left, bottom - top)
 
     def draw_shape(self, painter, tool, start, end):
         if tool == "line":
@@ -80,7 +510,7 @@ class Canvas(QWidget):
             x, y, w, h = self.rect_from_points(start, end)
             painter.drawRect(QRectF(x, y, w, h))
         elif tool == "circle":
-            radius = (start - end).manhattanLength()
+            radius = math.hypot(end.x() - start.x(), end.y() - start.y())
             painter.drawEllipse(start, radius, radius)
 
     def rect_from_points(self, p1, p2):
@@ -89,48 +519,63 @@ class Canvas(QWidget):
         return min(x1, x2), min(y1, y2), abs(x2 - x1), abs(y2 - y1)
 
     def snap(self, point):
-        x = round(point.x() / GRID_SIZE) * GRID_SIZE
-        y = round(point.y() / GRID_SIZE) * GRID_SIZE
-        return QPointF(x, y)
+        # Returns the same QPointF object for as long as the snapped grid
+        # point stays the same, so callers can detect "no change" with `is`.
+        x = (math.floor(point.x()) + GRID_SIZE // 2) // GRID_SIZE * GRID_SIZE
+        y = (math.floor(point.y()) + GRID_SIZE // 2) // GRID_SIZE * GRID_SIZE
+        last = self._last_snap
+        if last is not None and last[0] == x and last[1] == y:
+            return last[2]
+        snapped = QPointF(x, y)
+        self._last_snap = (x, y, snapped)
+        return snapped
 
     def export_svg(self, filename, color_mode="light"):
-        stroke_color = 'black' if color_mode == "light" else 'white'
-        dwg = svgwrite.Drawing(filename, profile='tiny')
-        for tool, start, end in self.shapes:
-            x1, y1 = start.x(), start.y()
-            x2, y2 = end.x(), end.y()
-            if tool == "line":
-                dwg.add(dwg.line((x1, y1), (x2, y2), stroke=stroke_color))
-            elif tool == "rectangle":
-                dwg.add(dwg.rect(insert=(min(x1, x2), min(y1, y2)),
-                                 size=(abs(x2 - x1), abs(y2 - y1)),
-                                 stroke=stroke_color, fill='none'))
-            elif tool == "circle":
-                radius = ((x2 - x1)**2 + (y2 - y1)**2)**0.5
-                dwg.add(dwg.circle(center=(x1, y1), r=radius, stroke=stroke_color, fill='none'))
-        dwg.save()
+        stroke = 'stroke="black"' if color_mode == "light" else 'stroke="white"'
+        tags = svg_tags(self._tool_id[:self._count], self._coords[:self._count], stroke)
+        with open(filename, "w", encoding="utf-8") as f:
+            f.write(SVG_HEADER)
+            if tags:
+                f.write("\n".join(tags))
+                f.write("\n")
+            f.write(SVG_FOOTER)
 
     def save_hcad(self, filename):
-        data = []
-        for tool, start, end in self.shapes:
-            data.append({
-                "tool": tool,
-                "start": [start.x(), start.y()],
-                "end": [end.x(), end.y()]
-            })
-        with open(filename, "w") as f:
-            json.dump(data, f)
+        # Version 2 files are columnar: each field is stored once as an array
+        # instead of once per shape.
+        tools = self._tool_id[:self._count]
+        x1, y1, x2, y2 = np.ascontiguousarray(self._coords[:self._count, :4].T)
+        data = {"v": HCAD_VERSION, "tools": tools, "x1": x1, "y1": y1, "x2": x2, "y2": y2}
+        if orjson is not None:
+            # orjson serializes the numpy arrays directly, no tolist() copy.
+            payload = orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY)
+        else:
+            payload = json.dumps({key: value if key == "v" else value.tolist()
+                                  for key, value in data.items()}).encode()
+        with open(filename, "wb") as f:
+            f.write(payload)
 
     def load_hcad(self, filename):
-        with open(filename, "r") as f:
-            data = json.load(f)
-        self.shapes = []
-        for item in data:
-            tool = item["tool"]
-            start = QPointF(*item["start"])
-            end = QPointF(*item["end"])
-            self.shapes.append((tool, start, end))
-        self.update()
+        with open(filename, "rb") as f:
+            payload = f.read()
+        data = orjson.loads(payload) if orjson is not None else json.loads(payload)
+        if isinstance(data, list):
+            # Version 0: one dict per shape.
+            tools = [TOOL_IDS[item["tool"]] for item in data]
+            coords = [item["start"] + item["end"] for item in data]
+        elif data.get("v", 1) == 1:
+            # Version 1: one [x1, y1, x2, y2] row per shape. Only development
+            # builds between the dict and columnar layouts wrote this, and
+            # without a "v" field.
+            tools, coords = data["tools"], data["coords"]
+        elif data["v"] != HCAD_VERSION:
+            raise ValueError(f"{filename} is a version {data['v']} .hcad file; "
+                             f"this HelioCAD reads versions up to {HCAD_VERSION}")
+        else:
+            tools = data["tools"]
+            coords = np.column_stack([np.asarray(data[key], dtype=np.float32)
+                                      for key in ("x1", "y1", "x2", "y2")])
+        self.set_shapes(tools, coords)
 
 class SettingsDialog(QDialog):
     def __init__(self, parent=None, settings=None, plugin_loader=None):
@@ -158,7 +603,7 @@ class SettingsDialog(QDialog):
             enabled_modules = self.settings.value("enabled_modules", [])
             if not isinstance(enabled_modules, list):
                 enabled_modules = []  # safety fallback
-            for name in self.plugin_loader.plugins.keys():
+            for name in self.plugin_loader.available_plugins():
                 checkbox = QCheckBox(name)
                 checked = True
                 if name in enabled_modules:
@@ -199,6 +644,10 @@ class PluginLoader:
         self.tab_widget = tab_widget
         self.plugins = {}
         self.plugin_widgets = {}
+        # Plugins known by name but only imported once they are enabled.
+        self._plugin_paths = {}
+        # folder -> (mtime, {name: path}) so rescanning an unchanged folder is one stat
+        self._folder_scans = {}
 
     def load_plugin(self, path):
         if not os.path.isfile(path):
@@ -206,9 +655,8 @@ class PluginLoader:
             return
         try:
             name = os.path.splitext(os.path.basename(path))[0]
-            spec = importlib.util.spec_from_file_location(name, path)
-            module = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(module)
+            self._plugin_paths.setdefault(name, path)
+            module = self._import_plugin(name, path)
             if hasattr(module, "register_plugin"):
                 widget = module.register_plugin(self.app, self.main_window, self.canvas)
                 self.plugins[name] = module
@@ -220,14 +668,87 @@ class PluginLoader:
         except Exception as e:
             print(f"Failed to load plugin {path}: {e}")
 
-    def load_plugins_from_folder(self, folder):
+    def _import_plugin(self, name, path):
+        # Plugins from a scanned plugin folder are imported through sys.path,
+        # which lets Python reuse the __pycache__ bytecode between runs. The
+        # folder is appended, not prepended, so a plugin can never shadow a
+        # real module of the same name. One-off files (e.g. from the Load
+        # Plugin dialog) are loaded straight from the file so their folder
+        # never ends up on sys.path.
+        folder = os.path.realpath(os.path.dirname(os.path.abspath(path)))
+        # Names that aren't identifiers (e.g. "my.dotted") would be read as
+        # package paths by the import system, so those also load from the file.
+        if name.isidentifier() and folder in {os.path.realpath(f) for f in self._folder_scans}:
+            if folder not in sys.path:
+                sys.path.append(folder)
+            module = sys.modules.get(name)
+            if module is not None and self._is_module_file(module, path):
+                return importlib.reload(module)
+            if module is None and self._finds_plugin(name, path):
+                return importlib.import_module(name)
+        # The name belongs to some other module, or the plugin is outside the
+        # plugin folders: load the file directly.
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+
+    def _finds_plugin(self, name, path):
+        spec = importlib.util.find_spec(name)
+        if spec is None or spec.origin is None:
+            # The file may be newer than the import system's folder listing
+            importlib.invalidate_caches()
+            spec = importlib.util.find_spec(name)
+        return (spec is not None and spec.origin is not None
+                and os.path.realpath(spec.origin) == os.path.realpath(path))
+
+    def _is_module_file(self, module, path):
+        module_file = getattr(module, "__file__", None)
+        return module_file is not None and os.path.realpath(module_file) == os.path.realpath(path)
+
+    def scan_folder(self, folder):
+        """Record the plugins in folder without importing them."""
+        cached = self._folder_scans.get(folder)
         if not os.path.isdir(folder):
             print(f"Plugin folder not found: {folder}")
+            if cached is not None:
+                self._forget_scanned(cached[1], {})
+                del self._folder_scans[folder]
             return
-        for filename in os.listdir(folder):
-            if filename.endswith(".py"):
-                full_path = os.path.join(folder, filename)
-                self.load_plugin(full_path)
+        mtime = os.stat(folder).st_mtime_ns
+        if cached is not None and cached[0] == mtime:
+            found = cached[1]
+        else:
+            # DirEntry caches the file type, so this costs no extra stat per file.
+            with os.scandir(folder) as entries:
+                found = {os.path.splitext(entry.name)[0]: entry.path
+                         for entry in entries
+                         if entry.name.endswith(".py") and entry.is_file()}
+            if cached is not None:
+                self._forget_scanned(cached[1], found)
+            self._folder_scans[folder] = (mtime, found)
+        self._plugin_paths.update(found)
+
+    def _forget_scanned(self, previous, found):
+        # Drop plugins whose file is gone since the last scan, unless they are
+        # already loaded (their tab still needs to be toggleable) or the name
+        # now points at a file loaded from somewhere else.
+        for name, path in previous.items():
+            if name not in found and name not in self.plugins and self._plugin_paths.get(name) == path:
+                del self._plugin_paths[name]
+
+    def load_plugins_from_folder(self, folder):
+        self.scan_folder(folder)
+        for name in list(self._plugin_paths):
+            self.ensure_loaded(name)
+
+    def ensure_loaded(self, name):
+        if name not in self.plugins and name in self._plugin_paths:
+            self.load_plugin(self._plugin_paths[name])
+        return name in self.plugins
+
+    def available_plugins(self):
+        return list(self._plugin_paths)
 
     def _tab_for_plugin(self, name):
         for i in range(self.tab_widget.count()):
@@ -236,6 +757,7 @@ class PluginLoader:
         return False
 
     def enable_plugin(self, name):
+        self.ensure_loaded(name)
         if name in self.plugin_widgets:
             widget = self.plugin_widgets[name]
             if not self._tab_for_plugin(name):
@@ -256,6 +778,7 @@ class HelioCAD(QMainWindow):
         super().__init__()
         self.setWindowTitle("HelioCAD v0.6 Plugin State Save Fix")
         self.settings = QSettings("Sunflare-Inc", "HelioCAD")
+        self._color_mode = None
 
         icon_path = "resources/icon.png"
         if os.path.isfile(icon_path):
@@ -301,19 +824,15 @@ class HelioCAD(QMainWindow):
         self.setCentralWidget(container)
         self.resize(1000, 700)
 
-        # Load all plugins first
-        self.plugin_loader.load_plugins_from_folder(PLUGIN_FOLDER)
+        # Find plugins first, but only import the ones that are enabled
+        self.plugin_loader.scan_folder(PLUGIN_FOLDER)
 
-        # Now check saved enabled modules and disable the rest immediately
         enabled_modules = self.settings.value("enabled_modules", [])
         if not isinstance(enabled_modules, list):
             enabled_modules = []
-        # Enable only saved enabled modules
-        for mod_name in self.plugin_loader.plugins.keys():
+        for mod_name in self.plugin_loader.available_plugins():
             if mod_name in enabled_modules:
                 self.plugin_loader.enable_plugin(mod_name)
-            else:
-                self.plugin_loader.disable_plugin(mod_name)
 
         self.apply_color_mode(self.settings.value("color_mode", "light"))
 
@@ -338,7 +857,13 @@ class HelioCAD(QMainWindow):
         if self.tab_widget.currentWidget() == self.canvas:
             path, _ = QFileDialog.getOpenFileName(self, "Load", "", "HelioCAD Files (*.hcad)")
             if path:
-                self.canvas.load_hcad(path)
+                self.open_hcad(path)
+
+    def open_hcad(self, path):
+        try:
+            self.canvas.load_hcad(path)
+        except (ValueError, KeyError, OSError) as e:
+            QMessageBox.warning(self, "Load", f"Could not load {path}:\n{e}")
 
     def load_plugin_dialog(self):
         path, _ = QFileDialog.getOpenFileName(self, "Load Plugin", "", "Python Files (*.py)")
@@ -346,6 +871,8 @@ class HelioCAD(QMainWindow):
             self.plugin_loader.load_plugin(path)
 
     def open_settings(self):
+        # Pick up plugins dropped into the folder since startup
+        self.plugin_loader.scan_folder(PLUGIN_FOLDER)
         dlg = SettingsDialog(self, self.settings, self.plugin_loader)
         if dlg.exec():
             new_settings = dlg.get_settings()
@@ -355,39 +882,12 @@ class HelioCAD(QMainWindow):
 
     def apply_color_mode(self, mode):
         self.canvas.set_color_mode(mode)
-        if mode == "dark":
-            self.setStyleSheet("""
-                QWidget {
-                    background-color: #222;
-                    color: #ddd;
-                }
-                QPushButton {
-                    background-color: #444;
-                    color: #ddd;
-                    border: none;
-                    padding: 5px;
-                }
-                QPushButton:hover {
-                    background-color: #666;
-                }
-            """)
-        else:
-            self.setStyleSheet("""
-                QWidget {
-                    background-color: white;
-                    color: black;
-                }
-                QPushButton {
-                    background-color: #eee;
-                    color: black;
-                    border: 1px solid #ccc;
-                    padding: 5px;
-                }
-                QPushButton:hover {
-                    background-color: #ddd;
-                }
-            """)
-
+        # setStyleSheet restyles every widget in the app, so skip it when
+        # the mode hasn't changed.
+        if mode == self._color_mode:
+            return
+        self._color_mode = mode
+        QApplication.instance().setStyleSheet(DARK_QSS if mode == "dark" else LIGHT_QSS)
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
@@ -396,7 +896,7 @@ if __name__ == "__main__":
     if len(sys.argv) > 1:
         filename = sys.argv[1]
         if os.path.isfile(filename):
-            window.canvas.load_hcad(filename)
+            window.open_hcad(filename)
 
     window.show()
     sys.exit(app.exec())